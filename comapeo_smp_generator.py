@@ -1,18 +1,29 @@
 # -*- coding: utf-8 -*-
 
+import copy
 import os
+import sys
 import json
 import math
+import queue
 import threading
 import hashlib
 import struct
 import zlib
 import shutil
 import zipfile
-import tempfile
 import time
 from typing import NamedTuple
 from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    # Numba is not part of a standard QGIS install; the NumPy broadcast
+    # path in _tile_bounds_grid is used instead.
+    numba = None
+
 from qgis.core import (
     QgsProject,
     QgsMapSettings,
@@ -21,9 +32,10 @@ from qgis.core import (
     QgsCoordinateTransform,
     QgsMessageLog,
     Qgis,
-    QgsMapRendererCustomPainterJob
+    QgsMapRendererCustomPainterJob,
+    QgsVectorSimplifyMethod
 )
-from qgis.PyQt.QtCore import QSize
+from qgis.PyQt.QtCore import QBuffer, QByteArray, QSize, Qt
 from qgis.PyQt.QtGui import QImage, QPainter, QImageWriter
 
 # Warn if estimated tile count exceeds this threshold
@@ -33,8 +45,159 @@ BYTES_PER_TILE_PNG = 50 * 1024
 BYTES_PER_TILE_JPG = 15 * 1024
 # Minimum free disk space to keep (100 MB)
 MIN_FREE_SPACE_BYTES = 100 * 1024 * 1024
+# zlib compression level for PNG tiles.  Qt defaults to maximum compression,
+# which dominates tile CPU time after rendering; level 1 is 2-3x faster for a
+# few percent larger tiles.
+PNG_COMPRESSION = 1
+# Pixel size of one XYZ tile
+TILE_SIZE = 256
+# Meta-tile edge length in tiles: adjacent tiles are rendered together in
+# blocks of up to META_TILE_FACTOR^2 tiles to amortise per-render-job setup
+META_TILE_FACTOR = 4
+# Zoom levels below this render without the label engine: a 256 px tile at
+# low zoom resolves only coarse geometry, and label placement dominates
+# vector render time at those scales
+LABEL_MIN_ZOOM = 6
 WORLD_BOUNDS_WGS84 = (-180.0, -85.0511, 180.0, 85.0511)
 
+# Constant skeletons for _create_style_from_canvas.  The fixed parts of
+# style.json live here; the builder deep-copies them and patches only the
+# per-export fields (bounds, zooms, source ids, center).
+_STYLE_RASTER_SOURCE_TEMPLATE = {
+    "format": None,
+    "name": None,
+    "version": "2.0",
+    "type": "raster",
+    "minzoom": None,
+    "maxzoom": None,
+    "scheme": "xyz",
+    "bounds": None,
+    "tiles": None
+}
+
+_STYLE_TEMPLATE = {
+    "version": 8,
+    "name": None,
+    "sources": {},
+    "layers": [
+        {
+            "id": "background",
+            "type": "background",
+            "paint": {
+                "background-color": "white"
+            }
+        }
+    ],
+    "metadata": {
+        "smp:bounds": None,
+        "smp:maxzoom": None,
+        "smp:sourceFolders": {}
+    },
+    "center": None,
+    "zoom": None
+}
+# Half-width of the Web Mercator (EPSG:3857) world square in metres
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _png_chunk(tag, payload):
+    """Return one serialized PNG chunk (length, tag, payload, CRC)."""
+    crc = zlib.crc32(tag + payload) & 0xFFFFFFFF
+    return struct.pack('>I', len(payload)) + tag + payload + struct.pack('>I', crc)
+
+
+def _encode_png_direct(img):
+    """
+    Encode a QImage as PNG straight through zlib, bypassing Qt.
+
+    QImageWriter copies the raster through Qt's image-plugin pipeline
+    before handing rows to libpng.  Tiles are plain 32-bit rasters, so the
+    PNG stream can be produced directly from the image buffer instead: a
+    zero-copy NumPy view of the pixel data is reordered into RGB(A)
+    scanlines and deflated at PNG_COMPRESSION with the RLE strategy, which
+    suits the flat areas typical of map tiles.
+
+    :param img: QImage in Format_ARGB32 or Format_RGB32
+    :return: PNG file bytes, or None when the image format (or host byte
+             order) is not supported and the caller should fall back to Qt
+    """
+    if sys.byteorder != 'little':
+        return None
+    if img.format() == QImage.Format_ARGB32:
+        channels = 4
+        color_type = 6  # truecolour with alpha
+    elif img.format() == QImage.Format_RGB32:
+        channels = 3
+        color_type = 2  # truecolour
+    else:
+        return None
+
+    width = img.width()
+    height = img.height()
+    stride = img.bytesPerLine()
+    ptr = img.constBits()
+    ptr.setsize(stride * height)
+    raster = np.frombuffer(ptr, dtype=np.uint8).reshape(height, stride)
+    # QImage 32-bit formats are B,G,R,A in memory on little-endian hosts
+    pixels = raster[:, :width * 4].reshape(height, width, 4)
+
+    rows = np.empty((height, 1 + width * channels), dtype=np.uint8)
+    rows[:, 0] = 0  # per-scanline filter type: None
+    rgb = rows[:, 1:].reshape(height, width, channels)
+    rgb[:, :, 0] = pixels[:, :, 2]
+    rgb[:, :, 1] = pixels[:, :, 1]
+    rgb[:, :, 2] = pixels[:, :, 0]
+    if channels == 4:
+        rgb[:, :, 3] = pixels[:, :, 3]
+
+    compressor = zlib.compressobj(
+        PNG_COMPRESSION, zlib.DEFLATED, 15, 8, zlib.Z_RLE
+    )
+    idat = compressor.compress(rows.tobytes()) + compressor.flush()
+
+    ihdr = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    return b''.join((
+        _PNG_SIGNATURE,
+        _png_chunk(b'IHDR', ihdr),
+        _png_chunk(b'IDAT', idat),
+        _png_chunk(b'IEND', b''),
+    ))
+
+
+if numba is not None:
+    @numba.njit(cache=True, fastmath=True)
+    def _tile_bounds_grid_jit(min_x, max_x, min_y, max_y, zoom):
+        """JIT-compiled kernel behind SMPGenerator._tile_bounds_grid.
+
+        Explicit loops compile to a single fused pass over the output
+        array, avoiding the intermediate allocations of the NumPy
+        broadcast fallback.
+        """
+        n = 1 << zoom  # 2^zoom
+        num_x = max_x - min_x + 2
+        num_y = max_y - min_y + 2
+        lon = np.empty(num_x, dtype=np.float64)
+        for i in range(num_x):
+            lon[i] = (min_x + i) / n * 360.0 - 180.0
+        lat = np.empty(num_y, dtype=np.float64)
+        for j in range(num_y):
+            lat[j] = math.degrees(
+                math.atan(math.sinh(math.pi * (1.0 - 2.0 * (min_y + j) / n)))
+            )
+        grid = np.empty((num_x - 1, num_y - 1, 4), dtype=np.float64)
+        for i in range(num_x - 1):
+            for j in range(num_y - 1):
+                grid[i, j, 0] = lon[i]       # west
+                grid[i, j, 1] = lat[j + 1]   # south
+                grid[i, j, 2] = lon[i + 1]   # east
+                grid[i, j, 3] = lat[j]       # north
+        return grid
+else:
+    _tile_bounds_grid_jit = None
+
 
 class LocalHeaderEntry(NamedTuple):
     offset: int
@@ -170,6 +333,216 @@ class TileCache:
 
 
 
+class SMPArchiveWriter:
+    """
+    Streams SMP archive entries straight into the output zip.
+
+    Tiles are encoded in memory by render workers and appended to the
+    archive as they finish, so no temporary tile directory is staged on
+    disk and each tile is written exactly once.  Tile payloads are already
+    compressed (PNG/JPG/WEBP), so they are stored uncompressed; only
+    style.json goes through DEFLATE.
+
+    The zip is staged as a '.part' sibling of the destination and moved
+    into place atomically on close(), so a cancelled, failed or crashed
+    run never clobbers an existing export at output_path and never leaves
+    a truncated archive there that looks finished.
+
+    Tile writes are decoupled from rendering: workers enqueue encoded
+    payloads on a bounded queue drained by a single writer thread, so
+    render CPU overlaps with archive I/O instead of every worker blocking
+    on the zipfile lock.  A full queue applies backpressure to the
+    renderers.  Writer-side failures (e.g. disk full) are re-raised on the
+    next write_tile() or on close().
+    """
+
+    def __init__(self, output_path, max_workers=None):
+        """
+        :param output_path: Path of the SMP archive to create
+        :param max_workers: Number of render workers feeding the archive;
+            sizes the write queue.  None uses the CPU count.
+        """
+        self.output_path = output_path
+        self._part_path = output_path + '.part'
+        self._zipf = zipfile.ZipFile(self._part_path, 'w', zipfile.ZIP_STORED)
+        self._lock = threading.Lock()
+        workers = max_workers if max_workers is not None else os.cpu_count() or 1
+        self._queue = queue.Queue(maxsize=max(1, workers * 2))
+        self._error = None
+        self._writer = threading.Thread(
+            target=self._drain, name='smp-archive-writer', daemon=True
+        )
+        self._writer.start()
+
+    def _drain(self):
+        """Writer thread: move queued tiles into the zip until the sentinel."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                # Keep consuming so producers blocked on a full queue can
+                # observe the error instead of deadlocking.
+                continue
+            arcname, data = item
+            try:
+                with self._lock:
+                    self._zipf.writestr(arcname, data,
+                                        compress_type=zipfile.ZIP_STORED)
+            except Exception as exc:  # re-raised on the producer side
+                self._error = exc
+
+    def _stop_writer(self):
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def write_style(self, style_json):
+        """Write style.json (DEFLATE-compressed)."""
+        with self._lock:
+            self._zipf.writestr('style.json', style_json,
+                                compress_type=zipfile.ZIP_DEFLATED)
+
+    def write_version(self, version='1.0'):
+        """Write the VERSION marker entry."""
+        with self._lock:
+            self._zipf.writestr('VERSION', version)
+
+    def write_tile(self, arcname, data):
+        """Queue one encoded tile for the writer thread."""
+        if self._error is not None:
+            raise self._error
+        self._queue.put((arcname, data))
+
+    def close(self):
+        """Finalise the archive and move it into place at output_path."""
+        self._stop_writer()
+        with self._lock:
+            self._zipf.close()
+        if self._error is not None:
+            raise self._error
+        os.replace(self._part_path, self.output_path)
+
+    def abort(self):
+        """Close and delete the partially written staging archive.
+
+        The destination path is never touched, so any previous export at
+        output_path survives a cancelled or failed run.
+        """
+        self._stop_writer()
+        self._error = None
+        with self._lock:
+            try:
+                self._zipf.close()
+            except Exception:
+                pass
+        try:
+            os.unlink(self._part_path)
+        except OSError:
+            pass
+
+
+class OverviewBuilder:
+    """
+    Assembles lower-zoom tiles by downsampling already rendered tiles.
+
+    Adjacent zoom levels share content: one tile at zoom z covers the same
+    area as a 2x2 block at zoom z+1, so when all four children of a tile are
+    part of the export the tile can be built by stitching the children into
+    a 512x512 canvas and scaling it down, instead of running another render
+    job over four times the area.
+
+    Tiles are fed bottom-up through add(): once the fourth child of a parent
+    arrives, the parent is assembled, handed to the emit callback (which
+    encodes and stores it) and then offered to its own parent in turn.
+    Tiles whose children are not fully covered by the export ranges are
+    reported by is_direct() and must be rendered directly.
+
+    The cascade is recursive — an assembled parent is offered upward in
+    turn — which is only visually correct for raster content; callers
+    gate on SMPGenerator._can_downsample_overviews before building one.
+
+    Thread-safe: add() may be called concurrently from render workers.
+    """
+
+    TILE_SIZE = 256
+
+    def __init__(self, ranges_by_zoom, emit):
+        """
+        :param ranges_by_zoom: Dict mapping zoom level to a list of
+            (min_x, max_x, min_y, max_y) tile ranges for one source
+        :param emit: Callable (zoom, x, y, image) invoked for each
+            assembled overview tile
+        """
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._pending = {}  # (zoom, x, y) -> [QImage canvas, children left]
+
+        coverage = {}
+        for zoom, ranges in ranges_by_zoom.items():
+            tiles = set()
+            for min_x, max_x, min_y, max_y in ranges:
+                for x in range(min_x, max_x + 1):
+                    for y in range(min_y, max_y + 1):
+                        tiles.add((x, y))
+            coverage[zoom] = tiles
+
+        # A tile can be downsampled only when all four children are part of
+        # the export (they are produced either by rendering or, recursively,
+        # by downsampling).  Partial parents at the range edge would miss
+        # content outside the extent that a direct render would include.
+        self._downsampled = {}
+        for zoom, tiles in coverage.items():
+            children = coverage.get(zoom + 1)
+            if children is None:
+                continue
+            self._downsampled[zoom] = {
+                (x, y) for (x, y) in tiles
+                if ((2 * x, 2 * y) in children and
+                    (2 * x + 1, 2 * y) in children and
+                    (2 * x, 2 * y + 1) in children and
+                    (2 * x + 1, 2 * y + 1) in children)
+            }
+
+    def downsample_count(self):
+        """Return the number of tiles that will be assembled from children."""
+        return sum(len(tiles) for tiles in self._downsampled.values())
+
+    def is_direct(self, zoom, x, y):
+        """Return True if the tile must be rendered directly."""
+        return (x, y) not in self._downsampled.get(zoom, ())
+
+    def add(self, zoom, x, y, img):
+        """Offer a finished tile; assemble and emit any completed parents."""
+        size = self.TILE_SIZE
+        while True:
+            parent = (zoom - 1, x // 2, y // 2)
+            if (parent[1], parent[2]) not in self._downsampled.get(parent[0], ()):
+                return
+            with self._lock:
+                entry = self._pending.get(parent)
+                if entry is None:
+                    canvas = QImage(2 * size, 2 * size, img.format())
+                    canvas.fill(0)
+                    entry = [canvas, 4]
+                    self._pending[parent] = entry
+                painter = QPainter(entry[0])
+                painter.drawImage((x % 2) * size, (y % 2) * size, img)
+                painter.end()
+                entry[1] -= 1
+                if entry[1] > 0:
+                    return
+                canvas = self._pending.pop(parent)[0]
+            scaled = canvas.scaled(
+                size, size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation
+            )
+            zoom, x, y = parent
+            self._emit(zoom, x, y, scaled)
+            # The emitted tile may complete its own parent; continue upwards.
+            img = scaled
+
+
 class SMPGenerator:
     """
     Class to generate SMP (Styled Map Package) files for CoMapeo
@@ -231,13 +604,6 @@ class SMPGenerator:
             )
         return fmt
 
-    # QGIS rendering (QgsMapRendererCustomPainterJob) is not safe to call
-    # concurrently from multiple threads.  This lock serialises all
-    # map-rendering calls so that only one job is active at a time, while
-    # still allowing the ThreadPoolExecutor to parallelise the cheap parts
-    # (cache checks, file I/O, progress bookkeeping).
-    _render_lock = threading.Lock()
-
     def __init__(self, feedback=None):
         """
         Initialize the SMP generator
@@ -245,6 +611,35 @@ class SMPGenerator:
         :param feedback: Feedback object for progress reporting
         """
         self.feedback = feedback
+        # Cached WGS84<->project CRS transforms (see _ensure_transforms).
+        # Building QgsCoordinateReferenceSystem/QgsCoordinateTransform per
+        # tile costs an EPSG database lookup and transform-context
+        # resolution each time, so they are built once and reused.
+        self._wgs84 = QgsCoordinateReferenceSystem("EPSG:4326")
+        self._project_crs = None
+        self._project_crs_authid = None
+        self._fwd = None  # WGS84 -> project CRS
+        self._inv = None  # project CRS -> WGS84
+        # Per-worker-thread render state (see _worker_map_settings).
+        # Replaced with a fresh threading.local at the start of each
+        # generation run so stale layer lists are never reused.
+        self._worker_state = threading.local()
+
+    def _ensure_transforms(self):
+        """
+        Build (or rebuild) the cached WGS84<->project CRS transforms.
+
+        The cache is invalidated lazily by comparing against the current
+        project CRS, so a generator instance stays correct if the project
+        CRS changes between runs.
+        """
+        project = QgsProject.instance()
+        crs = project.crs()
+        if self._fwd is None or crs != self._project_crs:
+            self._project_crs = crs
+            self._project_crs_authid = crs.authid()
+            self._fwd = QgsCoordinateTransform(self._wgs84, crs, project)
+            self._inv = QgsCoordinateTransform(crs, self._wgs84, project)
 
     def log(self, message, level=Qgis.Info):
         """
@@ -289,13 +684,49 @@ class SMPGenerator:
         lat_deg = math.degrees(lat_rad)
         return lat_deg, lon_deg
 
+    def _tile_bounds_grid(self, min_x, max_x, min_y, max_y, zoom):
+        """
+        Compute WGS84 bounds for every tile in a range in one vectorized pass
+
+        The per-tile scalar path (`_num2deg` twice per tile) spends most of
+        its time in the Python interpreter; computing the shared tile edges
+        as NumPy arrays and slicing them into per-tile bounds is far cheaper
+        for large ranges.
+
+        :param min_x: Minimum tile X coordinate (inclusive)
+        :param max_x: Maximum tile X coordinate (inclusive)
+        :param min_y: Minimum tile Y coordinate (inclusive)
+        :param max_y: Maximum tile Y coordinate (inclusive)
+        :param zoom: Zoom level
+        :return: ndarray of shape (num_x, num_y, 4) holding
+                 (west, south, east, north) per tile
+        """
+        if _tile_bounds_grid_jit is not None:
+            return _tile_bounds_grid_jit(min_x, max_x, min_y, max_y, zoom)
+
+        n = 1 << zoom  # 2^zoom
+        xs = np.arange(min_x, max_x + 2, dtype=np.float64)
+        ys = np.arange(min_y, max_y + 2, dtype=np.float64)
+        lon = xs / n * 360.0 - 180.0
+        lat = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * ys / n))))
+
+        west = lon[:-1]
+        east = lon[1:]
+        north = lat[:-1]
+        south = lat[1:]
+
+        grid = np.empty((west.size, south.size, 4), dtype=np.float64)
+        grid[:, :, 0] = west[:, np.newaxis]
+        grid[:, :, 1] = south[np.newaxis, :]
+        grid[:, :, 2] = east[:, np.newaxis]
+        grid[:, :, 3] = north[np.newaxis, :]
+        return grid
+
     def get_world_extent(self):
         """Return Web Mercator world bounds transformed to project CRS."""
         wgs84_rect = QgsRectangle(*WORLD_BOUNDS_WGS84)
-        wgs84 = QgsCoordinateReferenceSystem("EPSG:4326")
-        project_crs = QgsProject.instance().crs()
-        transform = QgsCoordinateTransform(wgs84, project_crs, QgsProject.instance())
-        return transform.transformBoundingBox(wgs84_rect)
+        self._ensure_transforms()
+        return self._fwd.transformBoundingBox(wgs84_rect)
 
     def _get_extent_for_zoom(self, extent, world_extent, zoom,
                              include_world_base_zooms=False, world_max_zoom=3):
@@ -321,6 +752,12 @@ class SMPGenerator:
             include_world_base_zooms=include_world_base_zooms,
             world_max_zoom=world_max_zoom
         )
+        # Transform each distinct extent to WGS84 once, not once per zoom.
+        extent_bounds = self._get_bounds_wgs84(extent)
+        world_bounds = (
+            self._get_bounds_wgs84(world_extent)
+            if world_extent is not None else None
+        )
         for zoom in export_zooms:
             zoom_extent = self._get_extent_for_zoom(
                 extent,
@@ -329,7 +766,12 @@ class SMPGenerator:
                 include_world_base_zooms=include_world_base_zooms,
                 world_max_zoom=world_max_zoom
             )
-            yield zoom, zoom_extent, self._calculate_tiles_at_zoom(zoom_extent, zoom)
+            zoom_bounds = (
+                world_bounds if zoom_extent is world_extent else extent_bounds
+            )
+            yield zoom, zoom_extent, self._calculate_tiles_at_zoom(
+                zoom_extent, zoom, bounds=zoom_bounds
+            )
 
     def _build_single_source_plan(self, extent, zoom_list, source_id, source_index):
         """Build a per-source export plan with 7-element tiles_by_zoom tuples.
@@ -343,9 +785,11 @@ class SMPGenerator:
         """
         tiles_by_zoom = []
         total_tiles = 0
+        bounds = self._get_bounds_wgs84(extent)
 
         for zoom in zoom_list:
-            for min_x, max_x, min_y, max_y in self._calculate_tiles_at_zoom(extent, zoom):
+            for min_x, max_x, min_y, max_y in self._calculate_tiles_at_zoom(
+                    extent, zoom, bounds=bounds):
                 num_tiles = (max_x - min_x + 1) * (max_y - min_y + 1)
                 tiles_by_zoom.append((zoom, min_x, max_x, min_y, max_y, num_tiles, source_index))
                 total_tiles += num_tiles
@@ -353,7 +797,7 @@ class SMPGenerator:
         return {
             'source_id': source_id,
             'source_index': source_index,
-            'source_bounds': self._get_bounds_wgs84(extent),
+            'source_bounds': bounds,
             'export_zooms': list(zoom_list),
             'tiles_by_zoom': tiles_by_zoom,
             'total_tiles': total_tiles,
@@ -658,10 +1102,12 @@ class SMPGenerator:
             world_max_zoom=world_max_zoom
         ):
             for min_x, max_x, min_y, max_y in ranges:
-                for x in range(min_x, max_x + 1):
-                    for y in range(min_y, max_y + 1):
-                        north, west = self._num2deg(x, y, zoom)
-                        south, east = self._num2deg(x + 1, y + 1, zoom)
+                grid = self._tile_bounds_grid(min_x, max_x, min_y, max_y, zoom)
+                for ix, x in enumerate(range(min_x, max_x + 1)):
+                    for iy, y in enumerate(range(min_y, max_y + 1)):
+                        west, south, east, north = (
+                            float(value) for value in grid[ix, iy]
+                        )
                         rects.append({
                             "zoom": zoom,
                             "x": x,
@@ -737,35 +1183,41 @@ class SMPGenerator:
 
         self.validate_disk_space(output_path, tile_count, tile_format)
 
-        # Create a temporary directory for the SMP contents
-        temp_dir = tempfile.mkdtemp()
-        self.log(f"Using temporary directory: {temp_dir}")
+        # Generate the style JSON up front; it is small and its content does
+        # not depend on rendering.
+        source_plans = export_plan.get('sources', [])
+        style = self._create_style_from_canvas(
+            extent, min_zoom, max_zoom, tile_format,
+            include_world_base_zooms=include_world_base_zooms,
+            world_max_zoom=world_max_zoom,
+            source_bounds=export_plan['source_bounds'],
+            source_plans=source_plans
+        )
+        # Compact separators: style.json is machine-read, pretty-printing
+        # only inflates the archive.
+        style_json = json.dumps(style, separators=(",", ":"))
+
+        archive_writer = None
+        if cache_dir is not None:
+            # Persistent cache: tiles must exist on disk for resume, so the
+            # archive is assembled from the cache directory afterwards.
+            os.makedirs(cache_dir, exist_ok=True)
+            tiles_dir = cache_dir
+            tile_cache = TileCache(cache_dir)
+        else:
+            # No cache: stream encoded tiles straight into the output zip.
+            # This avoids staging every tile in a temporary directory only to
+            # re-read and re-write it during archiving.
+            tiles_dir = None
+            tile_cache = None
+            archive_writer = SMPArchiveWriter(output_path,
+                                              max_workers=max_workers)
 
         try:
-            # Create the 's' directory for the style
-            style_dir = os.path.join(temp_dir, "s")
-            os.makedirs(style_dir, exist_ok=True)
-
-            # Generate the style.json file in the root directory
-            source_plans = export_plan.get('sources', [])
-            style = self._create_style_from_canvas(
-                extent, min_zoom, max_zoom, tile_format,
-                include_world_base_zooms=include_world_base_zooms,
-                world_max_zoom=world_max_zoom,
-                source_bounds=export_plan['source_bounds'],
-                source_plans=source_plans
-            )
-            style_path = os.path.join(temp_dir, "style.json")
-            with open(style_path, 'w') as f:
-                json.dump(style, f, indent=4)
-
-            if cache_dir is not None:
-                os.makedirs(cache_dir, exist_ok=True)
-                tiles_dir = cache_dir
-                tile_cache = TileCache(cache_dir)
-            else:
-                tiles_dir = style_dir
-                tile_cache = None
+            if archive_writer is not None:
+                archive_writer.write_style(style_json)
+                archive_writer.write_version()
+
             self._generate_tiles_from_canvas(
                 extent, min_zoom, max_zoom, tiles_dir,
                 tile_format=tile_format, jpeg_quality=jpeg_quality,
@@ -774,7 +1226,8 @@ class SMPGenerator:
                 tile_cache=tile_cache,
                 include_world_base_zooms=include_world_base_zooms,
                 world_max_zoom=world_max_zoom,
-                export_plan=export_plan
+                export_plan=export_plan,
+                archive_writer=archive_writer
             )
             if tile_cache is not None:
                 tile_cache.flush()
@@ -783,37 +1236,40 @@ class SMPGenerator:
             # partial archive.  Return None to signal cancellation to callers.
             if self.feedback and self.feedback.isCanceled():
                 self.log("Generation cancelled — no SMP archive created.")
+                if archive_writer is not None:
+                    archive_writer.abort()
+                    archive_writer = None
                 return None
 
-            # Build the set of tile paths that belong to *this* export so that
-            # stale tiles from previous runs are excluded from the archive.
-            # Only needed when cache_dir is used (otherwise tiles_dir is fresh).
-            tile_paths = None
-            if cache_dir is not None:
-                tile_paths = self._tile_paths_from_source_plans(source_plans, tile_format)
-
-            # Create the SMP file (zip archive)
-            archive_built = self._build_smp_archive(
-                style_path=os.path.join(temp_dir, "style.json"),
-                tiles_dir=tiles_dir,
-                output_path=output_path,
-                tile_paths=tile_paths
-            )
-            if not archive_built:
-                self.log("Generation cancelled during archive creation — no SMP archive created.")
-                return None
+            if archive_writer is not None:
+                archive_writer.close()
+                archive_writer = None
+            else:
+                # Build the set of tile paths that belong to *this* export so
+                # that stale tiles from previous cache runs are excluded.
+                tile_paths = self._tile_paths_from_source_plans(
+                    source_plans, tile_format
+                )
+
+                # Create the SMP file (zip archive) from the cache directory
+                archive_built = self._build_smp_archive(
+                    style_json=style_json,
+                    tiles_dir=tiles_dir,
+                    output_path=output_path,
+                    tile_paths=tile_paths
+                )
+                if not archive_built:
+                    self.log("Generation cancelled during archive creation — no SMP archive created.")
+                    return None
 
             self.log(f"SMP file generated successfully: {output_path}")
             return output_path  # type: ignore[return-value]
 
         except Exception as e:
             self.log(f"Error generating SMP file: {str(e)}", Qgis.Critical)
+            if archive_writer is not None:
+                archive_writer.abort()
             raise
-        finally:
-            # Always clean up temporary directory
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-                self.log(f"Cleaned up temporary directory: {temp_dir}")
 
     def _project_title_or_default(self):
         """Return the current project title or the legacy default style name."""
@@ -826,6 +1282,21 @@ class SMPGenerator:
             return base_name
         return "QGIS MAP"
 
+    @staticmethod
+    def _style_raster_source(tile_ext, name, minzoom, maxzoom, bounds,
+                             source_index):
+        """Return a raster source entry for style.json."""
+        source = copy.deepcopy(_STYLE_RASTER_SOURCE_TEMPLATE)
+        source["format"] = tile_ext
+        source["name"] = name
+        source["minzoom"] = minzoom
+        source["maxzoom"] = maxzoom
+        source["bounds"] = bounds
+        source["tiles"] = [
+            f"smp://maps.v1/s/{source_index}/{{z}}/{{x}}/{{y}}.{tile_ext}"
+        ]
+        return source
+
     def _create_style_from_canvas(self, extent, min_zoom, max_zoom, tile_format=None,
                                  include_world_base_zooms=False, world_max_zoom=3,
                                  source_bounds=None, source_plans=None):
@@ -860,73 +1331,48 @@ class SMPGenerator:
                 max(max(min_zoom, 0), min(max_zoom - 2, 11))
             )
 
-            style = {
-                "version": 8,
-                "name": self._project_title_or_default(),
-                "sources": {
-                    world_plan['source_id']: {
-                        "format": tile_ext,
-                        "name": "World Overview",
-                        "version": "2.0",
-                        "type": "raster",
-                        "minzoom": world_plan['export_zooms'][0],
-                        "maxzoom": world_plan['export_zooms'][-1],
-                        "scheme": "xyz",
-                        "bounds": world_bounds,
-                        "tiles": [
-                            f"smp://maps.v1/s/{world_plan['source_index']}/{{z}}/{{x}}/{{y}}.{tile_ext}"
-                        ]
-                    },
-                    region_plan['source_id']: {
-                        "format": tile_ext,
-                        "name": "Region Detail",
-                        "version": "2.0",
-                        "type": "raster",
-                        "minzoom": region_plan['export_zooms'][0],
-                        "maxzoom": region_plan['export_zooms'][-1],
-                        "scheme": "xyz",
-                        "bounds": region_bounds,
-                        "tiles": [
-                            f"smp://maps.v1/s/{region_plan['source_index']}/{{z}}/{{x}}/{{y}}.{tile_ext}"
-                        ]
+            style = copy.deepcopy(_STYLE_TEMPLATE)
+            style["name"] = self._project_title_or_default()
+            style["sources"] = {
+                world_plan['source_id']: self._style_raster_source(
+                    tile_ext, "World Overview",
+                    world_plan['export_zooms'][0],
+                    world_plan['export_zooms'][-1],
+                    world_bounds, world_plan['source_index']
+                ),
+                region_plan['source_id']: self._style_raster_source(
+                    tile_ext, "Region Detail",
+                    region_plan['export_zooms'][0],
+                    region_plan['export_zooms'][-1],
+                    region_bounds, region_plan['source_index']
+                )
+            }
+            style["layers"].extend([
+                {
+                    "id": "world-raster",
+                    "type": "raster",
+                    "source": world_plan['source_id'],
+                    "paint": {
+                        "raster-opacity": 1
                     }
                 },
-                "layers": [
-                    {
-                        "id": "background",
-                        "type": "background",
-                        "paint": {
-                            "background-color": "white"
-                        }
-                    },
-                    {
-                        "id": "world-raster",
-                        "type": "raster",
-                        "source": world_plan['source_id'],
-                        "paint": {
-                            "raster-opacity": 1
-                        }
-                    },
-                    {
-                        "id": "region-raster",
-                        "type": "raster",
-                        "source": region_plan['source_id'],
-                        "paint": {
-                            "raster-opacity": 1
-                        }
-                    }
-                ],
-                "metadata": {
-                    "smp:bounds": region_bounds,
-                    "smp:maxzoom": max_zoom,
-                    "smp:sourceFolders": {
-                        world_plan['source_id']: f"s/{world_plan['source_index']}",
-                        region_plan['source_id']: f"s/{region_plan['source_index']}"
+                {
+                    "id": "region-raster",
+                    "type": "raster",
+                    "source": region_plan['source_id'],
+                    "paint": {
+                        "raster-opacity": 1
                     }
-                },
-                "center": [center_lon, center_lat],
-                "zoom": default_zoom
+                }
+            ])
+            style["metadata"]["smp:bounds"] = region_bounds
+            style["metadata"]["smp:maxzoom"] = max_zoom
+            style["metadata"]["smp:sourceFolders"] = {
+                world_plan['source_id']: f"s/{world_plan['source_index']}",
+                region_plan['source_id']: f"s/{region_plan['source_index']}"
             }
+            style["center"] = [center_lon, center_lat]
+            style["zoom"] = default_zoom
             return style
 
         # Single-source style (backward compat, world disabled or source_plans=None)
@@ -957,51 +1403,29 @@ class SMPGenerator:
             source_id = "mbtiles-source"
             src_index = 0
 
-        style = {
-            "version": 8,
-            "name": self._project_title_or_default(),
-            "sources": {
-                source_id: {
-                    "format": tile_ext,
-                    "name": "QGIS Map",
-                    "version": "2.0",
-                    "type": "raster",
-                    "minzoom": effective_min_zoom,
-                    "maxzoom": max_zoom,
-                    "scheme": "xyz",
-                    "bounds": bounds,
-                    "tiles": [
-                        f"smp://maps.v1/s/{src_index}/{{z}}/{{x}}/{{y}}.{tile_ext}"
-                    ]
-                }
-            },
-            "layers": [
-                {
-                    "id": "background",
-                    "type": "background",
-                    "paint": {
-                        "background-color": "white"
-                    }
-                },
-                {
-                    "id": "raster",
-                    "type": "raster",
-                    "source": source_id,
-                    "paint": {
-                        "raster-opacity": 1
-                    }
-                }
-            ],
-            "metadata": {
-                "smp:bounds": bounds,
-                "smp:maxzoom": max_zoom,
-                "smp:sourceFolders": {
-                    source_id: f"s/{src_index}"
-                }
-            },
-            "center": [center_lon, center_lat],
-            "zoom": default_zoom
+        style = copy.deepcopy(_STYLE_TEMPLATE)
+        style["name"] = self._project_title_or_default()
+        style["sources"] = {
+            source_id: self._style_raster_source(
+                tile_ext, "QGIS Map", effective_min_zoom, max_zoom,
+                bounds, src_index
+            )
         }
+        style["layers"].append({
+            "id": "raster",
+            "type": "raster",
+            "source": source_id,
+            "paint": {
+                "raster-opacity": 1
+            }
+        })
+        style["metadata"]["smp:bounds"] = bounds
+        style["metadata"]["smp:maxzoom"] = max_zoom
+        style["metadata"]["smp:sourceFolders"] = {
+            source_id: f"s/{src_index}"
+        }
+        style["center"] = [center_lon, center_lat]
+        style["zoom"] = default_zoom
 
         return style
 
@@ -1012,15 +1436,9 @@ class SMPGenerator:
         :param extent: Extent in the project CRS
         :return: Bounds as [west, south, east, north]
         """
-        # Get the project CRS
-        project_crs = QgsProject.instance().crs()
-
-        # Create a coordinate transform to WGS84
-        wgs84 = QgsCoordinateReferenceSystem("EPSG:4326")
-        transform = QgsCoordinateTransform(project_crs, wgs84, QgsProject.instance())
-
-        # Transform the extent to WGS84
-        wgs84_extent = transform.transformBoundingBox(extent)
+        # Transform the extent to WGS84 using the cached transform
+        self._ensure_transforms()
+        wgs84_extent = self._inv.transformBoundingBox(extent)
 
         # Return as [west, south, east, north]
         return [
@@ -1102,6 +1520,13 @@ class SMPGenerator:
         return digest.hexdigest()
 
     def _visible_layers_in_render_order(self, project):
+        """
+        Return visible layers ordered as the layer panel renders them.
+
+        Visibility is snapshotted in a single findLayers() traversal and
+        filtered through id sets — never one findLayer(id) tree lookup per
+        layer, which would be quadratic in large projects.
+        """
         root = project.layerTreeRoot()
         visible_nodes = [
             node for node in root.findLayers()
@@ -1126,105 +1551,381 @@ class SMPGenerator:
 
         return visible_layers
 
-    def _render_single_tile(self, map_settings_template, zoom, x, y, tiles_dir,
-                            tile_format, jpeg_quality, resume,
-                            tile_cache=None, fingerprint=None,
-                            cancel_event=None, source_index=0):
+    def _encode_tile_image(self, img, tile_format, jpeg_quality):
         """
-        Render a single tile and save it to disk.
+        Encode a rendered tile image to bytes in the requested format.
 
-        :param map_settings_template: Preconfigured QgsMapSettings template
+        :param img: Rendered QImage
+        :param tile_format: Tile image format ('PNG', 'JPG' or 'WEBP')
+        :param jpeg_quality: JPEG/WebP quality (1-100)
+        :return: Encoded image bytes
+        :raises OSError: If encoding fails
+        """
+        if tile_format == self.TILE_FORMAT_PNG:
+            data = _encode_png_direct(img)
+            if data is not None:
+                return data
+
+        qt_format = self._qt_image_format(tile_format)
+        ba = QByteArray()
+        buf = QBuffer(ba)
+        buf.open(QBuffer.WriteOnly)
+        writer = QImageWriter(buf, qt_format.encode('ascii'))
+        if tile_format in (self.TILE_FORMAT_JPG, self.TILE_FORMAT_WEBP):
+            writer.setQuality(jpeg_quality)
+        else:
+            writer.setCompression(PNG_COMPRESSION)
+        ok = writer.write(img)
+        buf.close()
+        if not ok:
+            raise OSError(f"Failed to encode rendered tile as {tile_format}")
+        return bytes(ba)
+
+    @staticmethod
+    def _image_is_blank(img):
+        """
+        Return True when a rendered tile contains only the background fill.
+
+        Blank tiles — fully transparent for the ARGB32 formats, solid white
+        for RGB32 — carry no map content.  MapLibre's raster source
+        tolerates missing tiles and the style's white background shows
+        through, so blank tiles can be dropped from the archive with no
+        visual difference.
+        """
+        width = img.width()
+        height = img.height()
+        stride = img.bytesPerLine()
+        ptr = img.constBits()
+        ptr.setsize(stride * height)
+        raster = np.frombuffer(ptr, dtype=np.uint8).reshape(height, stride)
+        # Ignore any row padding beyond the pixel data
+        view = raster[:, :width * 4]
+        if img.format() == QImage.Format_ARGB32:
+            return not view.any()
+        if img.format() == QImage.Format_RGB32:
+            # The unused X channel is 0xFF for filled and rendered pixels
+            return bool((view == 0xFF).all())
+        return False
+
+    def _store_tile_image(self, img, zoom, x, y, source_index, tiles_dir,
+                          tile_format, jpeg_quality, tile_cache=None,
+                          fingerprint=None, archive_writer=None):
+        """
+        Encode a rendered tile and write it to the archive or tiles_dir.
+
+        The destination directory must already exist when writing to
+        tiles_dir.
+
+        :param img: Rendered QImage
         :param zoom: Zoom level
         :param x: Tile x coordinate
         :param y: Tile y coordinate
-        :param tiles_dir: Root directory for tiles
-        :param tile_format: Tile image format ('PNG' or 'JPG')
-        :param jpeg_quality: JPEG compression quality (1-100)
-        :param resume: Skip rendering if tile already exists
-        :param tile_cache: Optional TileCache for freshness checks and updates
+        :param source_index: Source index for multi-source archives
+        :param tiles_dir: Root directory for tiles (ignored when streaming)
+        :param tile_format: Tile image format ('PNG', 'JPG' or 'WEBP')
+        :param jpeg_quality: JPEG/WebP quality (1-100)
+        :param tile_cache: Optional TileCache to record the tile in
         :param fingerprint: Current generation fingerprint
-        :param cancel_event: Optional threading.Event; if set, skip rendering
-        :param source_index: Source index for multi-source archives (default 0)
-        :return: True if rendered, False if skipped or cancelled
+        :param archive_writer: Optional SMPArchiveWriter to stream into
         """
-        # Bail out immediately if cancellation has been signalled
-        if cancel_event is not None and cancel_event.is_set():
-            return False
+        if self._image_is_blank(img):
+            # No content: skip encoding and storage entirely.  The tile is
+            # deliberately not recorded in the cache — a resumed run will
+            # re-render and re-skip it, keeping the freshness check simple.
+            return
 
         tile_ext = self._tile_extension(tile_format)
-        qt_format = self._qt_image_format(tile_format)
+        data = self._encode_tile_image(img, tile_format, jpeg_quality)
 
-        x_dir = os.path.join(tiles_dir, str(source_index), str(zoom), str(x))
-        os.makedirs(x_dir, exist_ok=True)
-        tile_path = os.path.join(x_dir, f"{y}.{tile_ext}")
+        if archive_writer is not None:
+            archive_writer.write_tile(
+                f"s/{source_index}/{zoom}/{x}/{y}.{tile_ext}", data
+            )
+        else:
+            tile_path = os.path.join(
+                tiles_dir, str(source_index), str(zoom), str(x), f"{y}.{tile_ext}"
+            )
+            try:
+                with open(tile_path, 'wb') as fh:
+                    fh.write(data)
+            except OSError:
+                try:
+                    os.unlink(tile_path)
+                except OSError:
+                    pass
+                raise
+
+        if tile_cache is not None:
+            tile_cache.mark(zoom, x, y, fingerprint, defer_save=True,
+                            source_index=source_index)
+
+    def _worker_map_settings(self, template):
+        """
+        Return this worker thread's QgsMapSettings clone of the template.
+
+        QgsMapSettings cannot be shared across threads, but rebuilding a
+        clone (CRS + layer list) for every block repeats the same per-layer
+        setup thousands of times per export.  Each worker thread bakes one
+        clone on first use; only extent and output size change per block.
+
+        :param template: Preconfigured QgsMapSettings template
+        :return: The calling thread's private QgsMapSettings
+        """
+        ms = getattr(self._worker_state, 'map_settings', None)
+        if ms is None:
+            ms = QgsMapSettings()
+            ms.setDestinationCrs(template.destinationCrs())
+            ms.setLayers(template.layers())
+            self._worker_state.map_settings = ms
+        return ms
+
+    def _worker_image(self, width, height, image_format, fill):
+        """
+        Return this worker thread's reusable QImage of the given shape.
+
+        Allocating a fresh block image (256 KB to 4 MB) for every render
+        churns the allocator across thousands of blocks.  Each worker keeps
+        one image per (size, format) — in practice the full meta-tile size
+        plus the edge remainders — and clears it with fill() before reuse.
+        Reuse is safe because each worker stores and hands off the rendered
+        pixels before starting its next block.
+
+        :param width: Image width in pixels
+        :param height: Image height in pixels
+        :param image_format: QImage format constant
+        :param fill: Fill value applied before the image is returned
+        :return: The calling thread's private QImage
+        """
+        images = getattr(self._worker_state, 'images', None)
+        if images is None:
+            images = {}
+            self._worker_state.images = images
+        key = (width, height, image_format)
+        img = images.get(key)
+        if img is None:
+            img = QImage(width, height, image_format)
+            images[key] = img
+        img.fill(fill)
+        return img
+
+    def _worker_painter(self):
+        """Return this worker thread's reusable QPainter (not yet begun)."""
+        painter = getattr(self._worker_state, 'painter', None)
+        if painter is None:
+            painter = QPainter()
+            self._worker_state.painter = painter
+        return painter
+
+    def _apply_vector_simplification(self, layers):
+        """
+        Enable render-time geometry simplification on vector layers.
 
-        if resume and os.path.exists(tile_path):
-            if tile_cache is None or tile_cache.is_fresh(zoom, x, y, fingerprint, source_index=source_index):
+        Low zoom tiles cannot resolve full-resolution geometry, yet the
+        renderer still walks every vertex unless the layer opts in to
+        simplification.  This forces it on for the duration of an export.
+        The threshold is expressed in output pixels, so the same setting is
+        scale-relative: detail below one pixel collapses at every zoom.
+
+        :param layers: Layers from _visible_layers_in_render_order
+        :return: List of (layer, previous_method) pairs for
+            _restore_vector_simplification
+        """
+        saved = []
+        for layer in layers:
+            get_method = getattr(layer, 'simplifyMethod', None)
+            set_method = getattr(layer, 'setSimplifyMethod', None)
+            if not callable(get_method) or not callable(set_method):
+                # Raster and other non-vector layers
+                continue
+            try:
+                previous = get_method()
+                method = QgsVectorSimplifyMethod()
+                method.setSimplifyHints(
+                    QgsVectorSimplifyMethod.GeometrySimplification |
+                    QgsVectorSimplifyMethod.AntialiasingSimplification
+                )
+                method.setThreshold(1.0)
+                set_method(method)
+            except Exception:
+                continue
+            saved.append((layer, previous))
+        if saved:
+            self.log(
+                f"Enabled render-time geometry simplification on "
+                f"{len(saved)} vector layer(s)"
+            )
+        return saved
+
+    @staticmethod
+    def _restore_vector_simplification(saved):
+        """Restore settings captured by _apply_vector_simplification."""
+        for layer, previous in saved:
+            try:
+                layer.setSimplifyMethod(previous)
+            except Exception:
+                pass
+
+    def _can_downsample_overviews(self, layers):
+        """
+        Return True when lower zooms can be downsampled from higher zooms.
+
+        Downsampling assumes a tile looks the same whether rendered at its
+        own zoom or scaled down from the zoom above it.  That only holds
+        for raster content, where pyramid averaging is the correct
+        resampling.  Vector symbology defaults to fixed output units
+        (millimetres/points), so a stroke or marker rendered once at max
+        zoom thins by half with every cascade level instead of being
+        redrawn at constant width — and labels, scale ranges on renderer
+        rules and similar scale-dependent styling cannot be detected
+        reliably from layer-level flags.  Any non-raster layer therefore
+        disables the optimization, as does scale-based visibility on a
+        raster layer, and every zoom is rendered directly.
+        """
+        for layer in layers:
+            if not callable(getattr(layer, 'bandCount', None)):
+                # Not a raster layer: vector (and mesh etc.) symbology does
+                # not survive repeated 2:1 averaging.
                 return False
+            if self._safe_call(layer, 'hasScaleBasedVisibility'):
+                return False
+        return True
 
-        tile_extent = self._calculate_tile_extent(x, y, zoom)
+    def _render_tile_block(self, map_settings_template, zoom, tiles,
+                           origin_x, origin_y, cols, rows, block_extent,
+                           tiles_dir, tile_format, jpeg_quality, resume,
+                           tile_cache=None, fingerprint=None,
+                           cancel_event=None, source_index=0,
+                           archive_writer=None, overview=None):
+        """
+        Render a block of adjacent tiles with a single map render job.
 
-        # Each thread must use an independent map settings instance.
-        ms = QgsMapSettings()
-        ms.setDestinationCrs(map_settings_template.destinationCrs())
-        ms.setLayers(map_settings_template.layers())
-        ms.setOutputSize(map_settings_template.outputSize())
-        ms.setExtent(tile_extent)
+        Every QgsMapRendererCustomPainterJob pays a fixed setup cost (layer
+        iterators, symbol caches, label engine); rendering a meta-tile of up
+        to META_TILE_FACTOR x META_TILE_FACTOR tiles in one job amortises
+        that cost, and the individual 256x256 tiles are carved out of the
+        result.  Callers must only build multi-tile blocks for EPSG:3857
+        projects, where the XYZ grid is uniform in projected space so
+        carving on pixel boundaries is exact; other projects pass 1x1
+        blocks with a per-tile extent.
 
-        tile_size = 256
-        if tile_format == self.TILE_FORMAT_JPG:
-            img = QImage(tile_size, tile_size, QImage.Format_RGB32)
-            img.fill(0xFFFFFFFF)
+        :param map_settings_template: Preconfigured QgsMapSettings template
+        :param zoom: Zoom level
+        :param tiles: List of (x, y) tile coordinates to produce
+        :param origin_x: Tile X coordinate of the block's west column
+        :param origin_y: Tile Y coordinate of the block's north row
+        :param cols: Number of tile columns in the block
+        :param rows: Number of tile rows in the block
+        :param block_extent: QgsRectangle covering the block in project CRS
+        :param tiles_dir: Root directory for tiles
+        :param tile_format: Tile image format ('PNG', 'JPG' or 'WEBP')
+        :param jpeg_quality: JPEG/WebP quality (1-100)
+        :param resume: Skip tiles already present in tiles_dir
+        :param tile_cache: Optional TileCache for freshness checks and updates
+        :param fingerprint: Current generation fingerprint
+        :param cancel_event: Optional threading.Event; if set, skip rendering
+        :param source_index: Source index for multi-source archives (default 0)
+        :param archive_writer: Optional SMPArchiveWriter; when set, encoded
+            tiles are streamed into the archive instead of written to
+            tiles_dir
+        :param overview: Optional OverviewBuilder to feed rendered images
+            into so lower-zoom tiles can be assembled from them
+        :return: Number of tiles stored (0 if skipped or cancelled)
+        """
+        # Bail out immediately if cancellation has been signalled
+        if cancel_event is not None and cancel_event.is_set():
+            return 0
+
+        # Work out which tiles in the block still need to be produced
+        pending = tiles
+        if resume and archive_writer is None:
+            tile_ext = self._tile_extension(tile_format)
+            pending = []
+            for x, y in tiles:
+                tile_path = os.path.join(
+                    tiles_dir, str(source_index), str(zoom), str(x),
+                    f"{y}.{tile_ext}"
+                )
+                if os.path.exists(tile_path) and (
+                        tile_cache is None or
+                        tile_cache.is_fresh(zoom, x, y, fingerprint,
+                                            source_index=source_index)):
+                    continue
+                pending.append((x, y))
+            if not pending:
+                return 0
+
+        # Each thread uses an independent, reusable map settings instance.
+        ms = self._worker_map_settings(map_settings_template)
+        ms.setOutputSize(QSize(cols * TILE_SIZE, rows * TILE_SIZE))
+        ms.setExtent(block_extent)
+        # Skip the label engine at low zooms; see LABEL_MIN_ZOOM.
+        ms.setFlag(QgsMapSettings.DrawLabeling, zoom >= LABEL_MIN_ZOOM)
+
+        if tile_format == self.TILE_FORMAT_WEBP:
+            # WebP keeps the alpha channel
+            img = self._worker_image(
+                cols * TILE_SIZE, rows * TILE_SIZE,
+                QImage.Format_ARGB32, 0
+            )
         else:
-            # PNG and WebP both support transparency
-            img = QImage(tile_size, tile_size, QImage.Format_ARGB32)
-            img.fill(0)
+            # The generated style always places the tiles over a solid white
+            # background, so PNG and JPG tiles are opaque.  Rendering into
+            # RGB32 keeps Qt's compositor off the alpha-blended path and
+            # gives PNG a 3-channel payload (roughly 25% smaller) for free.
+            img = self._worker_image(
+                cols * TILE_SIZE, rows * TILE_SIZE,
+                QImage.Format_RGB32, 0xFFFFFFFF
+            )
 
-        painter = QPainter(img)
+        painter = self._worker_painter()
+        painter.begin(img)
         cancelled = False
-        with self._render_lock:
-            # QgsMapRendererCustomPainterJob is not thread-safe; only one
-            # render job may be active at a time.  The lock also ensures
-            # that the Qt event loop can process the job's completion
-            # signal without contention from parallel workers.
-            job = QgsMapRendererCustomPainterJob(ms, painter)
-            job.start()
-            job.waitForFinished()
-            # Check cancellation *after* the job finishes so we can
-            # still abort early for subsequent tiles.
-            if ((cancel_event is not None and cancel_event.is_set()) or
-                    (self.feedback and self.feedback.isCanceled())):
-                if cancel_event is not None:
-                    cancel_event.set()
-                cancelled = True
+        # renderSynchronously() is documented as safe to call from worker
+        # threads, and every worker uses its own QgsMapSettings, QImage and
+        # QPainter, so blocks render concurrently across CPU cores without
+        # needing a Qt event loop in the worker.
+        job = QgsMapRendererCustomPainterJob(ms, painter)
+        job.renderSynchronously()
+        # Check cancellation *after* the job finishes so we can
+        # still abort early for subsequent blocks.
+        if ((cancel_event is not None and cancel_event.is_set()) or
+                (self.feedback and self.feedback.isCanceled())):
+            if cancel_event is not None:
+                cancel_event.set()
+            cancelled = True
         painter.end()
 
         if cancelled:
-            return False
-
-        if tile_format in (self.TILE_FORMAT_JPG, self.TILE_FORMAT_WEBP):
-            saved = img.save(tile_path, qt_format, jpeg_quality)
-        else:
-            saved = img.save(tile_path, qt_format)
-
-        if not saved:
-            try:
-                os.unlink(tile_path)
-            except OSError:
-                pass
-            raise OSError(f"Failed to save rendered tile: {tile_path}")
+            return 0
 
-        if tile_cache is not None:
-            tile_cache.mark(zoom, x, y, fingerprint, defer_save=True, source_index=source_index)
+        stored = 0
+        for x, y in pending:
+            if cols == 1 and rows == 1:
+                tile_img = img
+            else:
+                tile_img = img.copy(
+                    (x - origin_x) * TILE_SIZE, (y - origin_y) * TILE_SIZE,
+                    TILE_SIZE, TILE_SIZE
+                )
+            self._store_tile_image(
+                tile_img, zoom, x, y, source_index, tiles_dir,
+                tile_format, jpeg_quality,
+                tile_cache=tile_cache, fingerprint=fingerprint,
+                archive_writer=archive_writer
+            )
+            if overview is not None:
+                overview.add(zoom, x, y, tile_img)
+            stored += 1
 
-        return True
+        return stored
 
     def _generate_tiles_from_canvas(self, extent, min_zoom, max_zoom, tiles_dir,
                                     tile_format=None, jpeg_quality=85, resume=False,
                                     max_workers=None, tile_cache=None,
                                     include_world_base_zooms=False,
                                     world_max_zoom=3,
-                                    export_plan=None):
+                                    export_plan=None,
+                                    archive_writer=None):
         """
         Generate tiles from the current map canvas
 
@@ -1237,6 +1938,8 @@ class SMPGenerator:
         :param resume: Skip rendering for tiles already present in tiles_dir
         :param max_workers: Number of thread workers. None uses CPU count.
         :param tile_cache: Optional TileCache for incremental invalidation
+        :param archive_writer: Optional SMPArchiveWriter; when set, tiles are
+            streamed into the output archive instead of written to tiles_dir
         """
         if tile_format is None:
             tile_format = self.TILE_FORMAT_PNG
@@ -1278,8 +1981,7 @@ class SMPGenerator:
         self.log(f"Total tiles to generate: {total_tiles}")
 
         # Set the tile size
-        tile_size = 256
-        map_settings.setOutputSize(QSize(tile_size, tile_size))
+        map_settings.setOutputSize(QSize(TILE_SIZE, TILE_SIZE))
 
         for zoom, min_x, max_x, min_y, max_y, num_tiles, source_index in tiles_by_zoom:
             self.log(
@@ -1297,6 +1999,19 @@ class SMPGenerator:
                 label = source_labels.get(si, f"Source {si}")
                 self.log(f"{label} tiles: {source_tile_counts[si]} (source {si})")
 
+        if archive_writer is None:
+            # Pre-create every tile column directory in one pass so workers
+            # never stat or mkdir per tile; overview tiles land in these
+            # same ranges, so they are covered too.
+            for zoom, min_x, max_x, _my, _My, _num, source_index in tiles_by_zoom:
+                zoom_dir = os.path.join(tiles_dir, str(source_index), str(zoom))
+                for x in range(min_x, max_x + 1):
+                    os.makedirs(os.path.join(zoom_dir, str(x)), exist_ok=True)
+
+        # Fresh per-worker render state for this run (layer list may differ
+        # from previous runs of the same generator instance).
+        self._worker_state = threading.local()
+
         tiles_completed = 0
         last_reported_pct = -1
         progress_lock = threading.Lock()
@@ -1310,9 +2025,79 @@ class SMPGenerator:
         if self.feedback and total_tiles > 0:
             self.feedback.setProgress(0)
 
+        def record_tile_done(count=1):
+            # setProgress crosses into the Qt main thread; emitting only on
+            # whole-percent changes caps a run at ~100 signals regardless of
+            # tile count.
+            nonlocal tiles_completed, last_reported_pct
+            with progress_lock:
+                tiles_completed += count
+                if (self.feedback and total_tiles > 0 and
+                        not self.feedback.isCanceled()):
+                    new_pct = int((tiles_completed / total_tiles) * 100)
+                    if new_pct != last_reported_pct:
+                        self.feedback.setProgress(new_pct)
+                        last_reported_pct = new_pct
+
+        # Overview downsampling: build lower-zoom tiles from the rendered
+        # tiles of the zoom above instead of re-rendering four times the
+        # area.  Only for fresh (non-cached) exports — resumable runs may
+        # skip tiles, which would starve the pyramid — and only for
+        # raster-only layer stacks, where pyramid averaging is correct
+        # (see _can_downsample_overviews).
+        ranges_by_source = {}
+        source_order = []
+        for zoom, min_x, max_x, min_y, max_y, _num, source_index in tiles_by_zoom:
+            if source_index not in ranges_by_source:
+                ranges_by_source[source_index] = {}
+                source_order.append(source_index)
+            ranges_by_source[source_index].setdefault(zoom, []).append(
+                (min_x, max_x, min_y, max_y)
+            )
+
+        overview_builders = {}
+        if (tile_cache is None and not resume and
+                self._can_downsample_overviews(visible_layers)):
+
+            def make_overview_emitter(source_index):
+                def emit(zoom, x, y, img):
+                    if (cancel_event.is_set() or
+                            (self.feedback and self.feedback.isCanceled())):
+                        return
+                    self._store_tile_image(
+                        img, zoom, x, y, source_index, tiles_dir,
+                        tile_format, jpeg_quality,
+                        tile_cache=tile_cache, fingerprint=fingerprint,
+                        archive_writer=archive_writer
+                    )
+                    record_tile_done()
+                return emit
+
+            for source_index in source_order:
+                if len(ranges_by_source[source_index]) > 1:
+                    overview_builders[source_index] = OverviewBuilder(
+                        ranges_by_source[source_index],
+                        make_overview_emitter(source_index)
+                    )
+            downsampled_total = sum(
+                builder.downsample_count()
+                for builder in overview_builders.values()
+            )
+            if downsampled_total:
+                self.log(
+                    f"{downsampled_total} lower-zoom tiles will be "
+                    f"downsampled from rendered tiles instead of re-rendered"
+                )
+
         source_labels = {0: "World overview", 1: "Region detail"}
         _current_source = [None]
 
+        # Meta-tiling requires an XYZ grid that is uniform in projected
+        # space so tiles can be carved out of a block render on exact pixel
+        # boundaries; that only holds for Web Mercator projects.
+        self._ensure_transforms()
+        use_meta_tiles = self._project_crs_authid == "EPSG:3857"
+
         def iter_tile_tasks():
             for zoom, min_x, max_x, min_y, max_y, _, source_index in tiles_by_zoom:
                 if _current_source[0] is not None and source_index != _current_source[0]:
@@ -1320,66 +2105,110 @@ class SMPGenerator:
                     next_label = source_labels.get(source_index, f"Source {source_index}")
                     self.log(f"Completed {prev_label.lower()} tiles, starting {next_label.lower()} tiles...")
                 _current_source[0] = source_index
+                overview = overview_builders.get(source_index)
+
+                if use_meta_tiles:
+                    tile_span = 2 * WEB_MERCATOR_HALF_WORLD / (1 << zoom)
+                    for bx in range(min_x, max_x + 1, META_TILE_FACTOR):
+                        for by in range(min_y, max_y + 1, META_TILE_FACTOR):
+                            block = [
+                                (x, y)
+                                for x in range(bx, min(bx + META_TILE_FACTOR, max_x + 1))
+                                for y in range(by, min(by + META_TILE_FACTOR, max_y + 1))
+                                if overview is None or overview.is_direct(zoom, x, y)
+                            ]
+                            if not block:
+                                continue
+                            # Shrink to the bounding box of the tiles actually
+                            # produced so overview-covered tiles do not
+                            # inflate the rendered area.
+                            origin_x = min(x for x, _ in block)
+                            origin_y = min(y for _, y in block)
+                            cols = max(x for x, _ in block) - origin_x + 1
+                            rows = max(y for _, y in block) - origin_y + 1
+                            west_m = origin_x * tile_span - WEB_MERCATOR_HALF_WORLD
+                            north_m = WEB_MERCATOR_HALF_WORLD - origin_y * tile_span
+                            block_extent = QgsRectangle(
+                                west_m, north_m - rows * tile_span,
+                                west_m + cols * tile_span, north_m
+                            )
+                            yield (zoom, block, origin_x, origin_y, cols, rows,
+                                   block_extent, source_index, overview)
+                    continue
+
+                # Precompute all project-CRS tile extents for this range in
+                # one pass; the grid is dropped once the range is exhausted.
+                extent_grid = self._tile_extent_grid(min_x, max_x, min_y, max_y, zoom)
                 for x in range(min_x, max_x + 1):
                     for y in range(min_y, max_y + 1):
-                        yield (zoom, x, y, source_index)
-
-        with ThreadPoolExecutor(max_workers=effective_workers) as executor:
-            futures = {}
-            tile_tasks = iter_tile_tasks()
+                        if overview is not None and not overview.is_direct(zoom, x, y):
+                            # Assembled by the OverviewBuilder once its four
+                            # children have been produced.
+                            continue
+                        yield (zoom, [(x, y)], x, y, 1, 1,
+                               extent_grid[(x, y)], source_index, overview)
+
+        simplify_saved = self._apply_vector_simplification(visible_layers)
+        try:
+            with ThreadPoolExecutor(max_workers=effective_workers) as executor:
+                futures = {}
+                tile_tasks = iter_tile_tasks()
 
-            def submit_pending():
-                while len(futures) < max_pending_futures:
-                    if self.feedback and self.feedback.isCanceled():
-                        cancel_event.set()
-                        return
+                def submit_pending():
+                    while len(futures) < max_pending_futures:
+                        if self.feedback and self.feedback.isCanceled():
+                            cancel_event.set()
+                            return
+
+                        try:
+                            (zoom, block, origin_x, origin_y, cols, rows,
+                             block_extent, source_index, overview) = next(tile_tasks)
+                        except StopIteration:
+                            return
+
+                        future = executor.submit(
+                            self._render_tile_block,
+                            map_settings, zoom, block,
+                            origin_x, origin_y, cols, rows, block_extent,
+                            tiles_dir, tile_format, jpeg_quality, resume,
+                            tile_cache, fingerprint, cancel_event,
+                            source_index=source_index,
+                            archive_writer=archive_writer,
+                            overview=overview
+                        )
+                        futures[future] = (zoom, block[0], len(block), source_index)
 
-                    try:
-                        zoom, x, y, source_index = next(tile_tasks)
-                    except StopIteration:
-                        return
+                submit_pending()
 
-                    future = executor.submit(
-                        self._render_single_tile,
-                        map_settings, zoom, x, y, tiles_dir,
-                        tile_format, jpeg_quality, resume,
-                        tile_cache, fingerprint, cancel_event,
-                        source_index=source_index
+                while futures:
+                    done, _pending = wait(
+                        list(futures.keys()),
+                        timeout=wait_timeout_seconds,
+                        return_when=FIRST_COMPLETED
                     )
-                    futures[future] = (zoom, x, y, source_index)
-
-            submit_pending()
 
-            while futures:
-                done, _pending = wait(
-                    list(futures.keys()),
-                    timeout=wait_timeout_seconds,
-                    return_when=FIRST_COMPLETED
-                )
-
-                if not done:
-                    if self.feedback and self.feedback.isCanceled():
-                        cancel_event.set()
-                        for pending_future in futures:
-                            pending_future.cancel()
-                        break
+                    if not done:
+                        if self.feedback and self.feedback.isCanceled():
+                            cancel_event.set()
+                            for pending_future in futures:
+                                pending_future.cancel()
+                            break
 
-                    now = time.monotonic()
-                    if now - last_wait_log >= heartbeat_interval_seconds:
-                        sample = list(futures.values())[:3]
-                        self.log(
-                            f"Waiting on {len(futures)} in-flight tiles; "
-                            f"completed {tiles_completed}/{total_tiles}. "
-                            f"Sample in-flight tiles: {sample}"
-                        )
-                        last_wait_log = now
-                    continue
+                        now = time.monotonic()
+                        if now - last_wait_log >= heartbeat_interval_seconds:
+                            sample = list(futures.values())[:3]
+                            self.log(
+                                f"Waiting on {len(futures)} in-flight tile blocks; "
+                                f"completed {tiles_completed}/{total_tiles} tiles. "
+                                f"Sample in-flight blocks: {sample}"
+                            )
+                            last_wait_log = now
+                        continue
 
-                for future in done:
-                    _done_tile = futures.pop(future, None)
-                    future.result()
-                    with progress_lock:
-                        tiles_completed += 1
+                    for future in done:
+                        _done_tile = futures.pop(future, None)
+                        future.result()
+                        record_tile_done(_done_tile[2] if _done_tile else 1)
                         if self.feedback and self.feedback.isCanceled():
                             # Signal all running workers to abort and cancel any
                             # futures that have not started yet.
@@ -1387,11 +2216,6 @@ class SMPGenerator:
                             for pending_future in futures:
                                 pending_future.cancel()
                             break
-                        if self.feedback and total_tiles > 0:
-                            new_pct = int((tiles_completed / total_tiles) * 100)
-                            if new_pct != last_reported_pct:
-                                self.feedback.setProgress(new_pct)
-                                last_reported_pct = new_pct
 
                         # Log when a source phase finishes
                         if _done_tile is not None:
@@ -1401,22 +2225,24 @@ class SMPGenerator:
                                 _label = source_labels.get(_done_source, f"Source {_done_source}")
                                 self.log(f"Completed {_label.lower()} tiles ({tiles_completed}/{total_tiles} total)")
 
-                if cancel_event.is_set():
-                    break
+                    if cancel_event.is_set():
+                        break
 
-                submit_pending()
+                    submit_pending()
+        finally:
+            self._restore_vector_simplification(simplify_saved)
 
         if self.feedback and not self.feedback.isCanceled() and total_tiles > 0:
             self.feedback.setProgress(100)
 
         self.log(f"Generated {tiles_completed} tiles from map canvas")
 
-    def _build_smp_archive(self, style_path, tiles_dir, output_path,
+    def _build_smp_archive(self, style_json, tiles_dir, output_path,
                            tile_paths=None, dedup=False):
         """
-        Create SMP archive using style.json and a tiles directory.
+        Create SMP archive using style JSON and a tiles directory.
 
-        :param style_path: Path to style.json
+        :param style_json: Serialized style.json content
         :param tiles_dir: Directory containing z/x/y tiles
         :param output_path: Output path for SMP archive
         :param tile_paths: Optional set of relative tile paths (using '/' as
@@ -1458,15 +2284,19 @@ class SMPGenerator:
 
         if dedup and tile_entries:
             return self._build_smp_archive_dedup(
-                style_path, tile_entries, output_path
+                style_json, tile_entries, output_path
             )
 
-        with zipfile.ZipFile(output_path, 'w') as zipf:
+        # Tile payloads are already DEFLATE-compressed (PNG) or otherwise
+        # entropy-coded (JPG/WEBP); re-running zlib over them costs CPU for
+        # ~0% size reduction, so the archive defaults to ZIP_STORED and only
+        # style.json is deflated.
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as zipf:
             if self.feedback and self.feedback.isCanceled():
                 cancelled = True
             else:
-                zipf.write(style_path, 'style.json',
-                           compress_type=zipfile.ZIP_DEFLATED)
+                zipf.writestr('style.json', style_json,
+                              compress_type=zipfile.ZIP_DEFLATED)
                 zipf.writestr('VERSION', '1.0')
             if not cancelled:
                 for fp, arcname in tile_entries:
@@ -1484,7 +2314,7 @@ class SMPGenerator:
             return False
         return True
 
-    def _build_smp_archive_dedup(self, style_path, tile_entries, output_path):
+    def _build_smp_archive_dedup(self, style_json, tile_entries, output_path):
         """Build an SMP archive with SHA-256 tile deduplication.
 
         Tiles with identical content are stored only once.  Duplicate
@@ -1492,7 +2322,7 @@ class SMPGenerator:
         the same local file header, so all tile paths resolve correctly
         when extracted while saving disk space for duplicate content.
 
-        :param style_path: Path to style.json
+        :param style_json: Serialized style.json content
         :param tile_entries: List of (abs_path, archive_name) tuples
         :param output_path: Output path for SMP archive
         :return: True on success, False on cancellation.
@@ -1537,8 +2367,7 @@ class SMPGenerator:
                 local_headers = []  # LocalHeaderEntry instances
 
                 # Write style.json
-                with open(style_path, 'rb') as sf:
-                    style_data = sf.read()
+                style_data = style_json.encode('utf-8')
                 style_crc = zipfile.crc32(style_data) & 0xFFFFFFFF
                 compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
                 style_compressed = compressor.compress(style_data) + compressor.flush()
@@ -1760,6 +2589,19 @@ class SMPGenerator:
         :param zoom: Zoom level
         :return: QgsRectangle in project CRS
         """
+        self._ensure_transforms()
+
+        # XYZ tiles are square in Web Mercator, so for an EPSG:3857 project
+        # the extent has a closed form and no CRS transform is needed.
+        if self._project_crs_authid == "EPSG:3857":
+            n = 1 << zoom  # 2^zoom
+            tile_span = 2 * WEB_MERCATOR_HALF_WORLD / n
+            west_m = xtile * tile_span - WEB_MERCATOR_HALF_WORLD
+            north_m = WEB_MERCATOR_HALF_WORLD - ytile * tile_span
+            return QgsRectangle(
+                west_m, north_m - tile_span, west_m + tile_span, north_m
+            )
+
         # Get WGS84 bounds for this tile (NW corner)
         north, west = self._num2deg(xtile, ytile, zoom)
         # Get SE corner (next tile's NW corner)
@@ -1768,24 +2610,66 @@ class SMPGenerator:
         # Create rectangle in WGS84
         wgs84_rect = QgsRectangle(west, south, east, north)
 
-        # Transform to project CRS
-        wgs84 = QgsCoordinateReferenceSystem("EPSG:4326")
-        project_crs = QgsProject.instance().crs()
-        transform = QgsCoordinateTransform(wgs84, project_crs, QgsProject.instance())
+        # Transform to project CRS using the cached transform
+        return self._fwd.transformBoundingBox(wgs84_rect)
+
+    def _tile_extent_grid(self, min_x, max_x, min_y, max_y, zoom):
+        """
+        Precompute project-CRS extents for every tile in a range.
 
-        return transform.transformBoundingBox(wgs84_rect)
+        Computes the WGS84 bounds for the whole range in one vectorized
+        pass (see _tile_bounds_grid) instead of rebuilding rectangles and
+        transforms per tile inside the render loop.
 
-    def _calculate_tiles_at_zoom(self, extent, zoom):
+        :param min_x: Minimum tile X coordinate (inclusive)
+        :param max_x: Maximum tile X coordinate (inclusive)
+        :param min_y: Minimum tile Y coordinate (inclusive)
+        :param max_y: Maximum tile Y coordinate (inclusive)
+        :param zoom: Zoom level
+        :return: Dict mapping (x, y) to QgsRectangle in project CRS
+        """
+        self._ensure_transforms()
+        extents = {}
+
+        if self._project_crs_authid == "EPSG:3857":
+            # Closed form, no transform needed (see _calculate_tile_extent)
+            n = 1 << zoom  # 2^zoom
+            tile_span = 2 * WEB_MERCATOR_HALF_WORLD / n
+            for x in range(min_x, max_x + 1):
+                west_m = x * tile_span - WEB_MERCATOR_HALF_WORLD
+                for y in range(min_y, max_y + 1):
+                    north_m = WEB_MERCATOR_HALF_WORLD - y * tile_span
+                    extents[(x, y)] = QgsRectangle(
+                        west_m, north_m - tile_span, west_m + tile_span, north_m
+                    )
+            return extents
+
+        grid = self._tile_bounds_grid(min_x, max_x, min_y, max_y, zoom)
+        for ix, x in enumerate(range(min_x, max_x + 1)):
+            for iy, y in enumerate(range(min_y, max_y + 1)):
+                west, south, east, north = (
+                    float(value) for value in grid[ix, iy]
+                )
+                extents[(x, y)] = self._fwd.transformBoundingBox(
+                    QgsRectangle(west, south, east, north)
+                )
+        return extents
+
+    def _calculate_tiles_at_zoom(self, extent, zoom, bounds=None):
         """
         Calculate tile ranges that intersect with the given extent using proper XYZ tiling.
         Handles antimeridian crossing by returning multiple ranges if necessary.
 
         :param extent: QgsRectangle extent to export
         :param zoom: Zoom level
+        :param bounds: Optional precomputed WGS84 bounds for the extent as
+            [west, south, east, north]; callers iterating many zoom levels
+            over the same extent pass this to transform the extent only once
         :return: List of tuples (min_x, max_x, min_y, max_y) tile coordinates
         """
         # Convert extent to WGS84
-        bounds = self._get_bounds_wgs84(extent)
+        if bounds is None:
+            bounds = self._get_bounds_wgs84(extent)
         west, south, east, north = bounds
 
         # Clamp latitude to Web Mercator limits (±85.0511 degrees)